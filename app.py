@@ -1,20 +1,62 @@
-from flask import Flask, render_template, request, jsonify
+import os
+
+# Keep native OpenMP/BLAS thread pools (NumPy, scikit-learn) single-threaded;
+# must be set before they load. The interpreter itself uses num_threads=1
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+from flask import Flask, render_template, request, jsonify, current_app
+from flask.json.provider import DefaultJSONProvider
 import numpy as np
-import pandas as pd
-from tensorflow.lite.python.interpreter import Interpreter
+import orjson
+try:
+    # Standalone LiteRT (TFLite) runtime: a fraction of the size and import time of TensorFlow
+    from ai_edge_litert.interpreter import Interpreter
+except ImportError:
+    from tensorflow.lite.python.interpreter import Interpreter
 import pickle
 from datetime import datetime
 from flask_pymongo import PyMongo
+from pymongo import WriteConcern
 import requests
 import tempfile
-import os
+import hashlib
+import stat
 import logging
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 # Logging setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson's C encoder/decoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response instead of going
+        # through dumps() and re-encoding a str. Same argument handling as
+        # jsonify(), without relying on Flask's private helpers
+        if args and kwargs:
+            raise TypeError("jsonify() behavior undefined when passed both args and kwargs")
+        obj = args[0] if len(args) == 1 else (args or kwargs or None)
+        return current_app.response_class(orjson.dumps(obj, default=self.default), mimetype=self.mimetype)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Configure the app
 if os.environ.get('FLASK_ENV') == 'production':
@@ -24,39 +66,170 @@ else:
     from config import DevelopmentConfig
     app.config.from_object(DevelopmentConfig)
 
-# Initialize MongoDB
-mongo = PyMongo(app)
+# Config values read on every request, bound once
+MAX_AGE = app.config['MAX_AGE']
+MAX_STUDY_HOURS = app.config['MAX_STUDY_HOURS']
+MAX_FAILURES = app.config['MAX_FAILURES']
+MAX_PREDICTION_SCORE = app.config['MAX_PREDICTION_SCORE']
+
+# Initialize MongoDB; connect=False defers opening sockets until the first
+# write, so a client created in a preloaded gunicorn master is fork-safe
+mongo = PyMongo(app, connect=False)
+
+# Number of input features: age, year1_marks, year2_marks, studytime, failures
+NUM_FEATURES = 5
 
 # Global variables
-interpreter = None
 scaler = None
+scaler_mean = None
+scaler_scale = None
+input_details = None
+output_details = None
+
+# Interpreters are not thread-safe, so each request checks one out of the
+# pool as an (interpreter, input tensor accessor) pair
+interpreter_pool = queue.Queue()
+
+# Prediction records waiting to be written to MongoDB by the background
+# writer thread; a None record tells the writer to stop
+mongo_write_queue = None
+mongo_writer_thread = None
+
+# Process the writer was started in, so forked workers start their own
+mongo_writer_pid = None
+mongo_writer_lock = threading.Lock()
+
+
+class PredictionError(Exception):
+    """
+    Raised when the model fails to produce a prediction.
+    """
+
+
+def private_cache_dir():
+    """
+    Returns MODEL_CACHE_DIR, creating it with mode 0o700, as long as it is a
+    directory owned by the current user that nobody else can write to. The
+    cached scaler gets unpickled, so otherwise fall back to a fresh private
+    temporary directory rather than trusting files another user could plant.
+    """
+    cache_dir = app.config['MODEL_CACHE_DIR']
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        st = os.lstat(cache_dir)
+        owned = not hasattr(os, 'getuid') or st.st_uid == os.getuid()
+        if stat.S_ISDIR(st.st_mode) and owned and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            return cache_dir
+        logger.warning(f"Model cache {cache_dir} is not a private directory, downloading to a temporary one")
+    except OSError as e:
+        logger.warning(f"Model cache {cache_dir} is unusable, downloading to a temporary one: {str(e)}")
+    return tempfile.mkdtemp(prefix='modelcache-')
+
+
+def file_sha256(path):
+    """
+    Returns the hex SHA-256 digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
 def download_file(url, suffix):
     """
-    Downloads a file from a URL and saves it to a temporary location.
-    Returns the file path.
+    Downloads a file from a URL into the local model cache and returns the file path.
+    A cached copy is reused as long as its recorded SHA-256 still matches and
+    the server still reports the same ETag.
     """
+    # One session per download: the HEAD and GET reuse a connection, and
+    # concurrent downloads never share a session across threads
+    http = requests.Session()
     try:
-        response = requests.get(url, stream=True)
+        cache_dir = private_cache_dir()
+        file_path = os.path.join(cache_dir, hashlib.sha256(url.encode()).hexdigest() + suffix)
+        etag_path = file_path + '.etag'
+        sha_path = file_path + '.sha256'
+
+        timeout = app.config['DOWNLOAD_TIMEOUT']
+
+        if all(os.path.exists(path) for path in (file_path, etag_path, sha_path)):
+            with open(etag_path) as f:
+                cached_etag = f.read()
+            with open(sha_path) as f:
+                cached_sha = f.read()
+            if file_sha256(file_path) != cached_sha:
+                logger.warning(f"Cached copy of {url} does not match its recorded SHA-256, downloading again")
+            else:
+                try:
+                    head = http.head(url, allow_redirects=True, timeout=timeout)
+                except requests.RequestException as e:
+                    # The verified cached copy is still valid to serve if the host is unreachable
+                    logger.warning(f"Could not revalidate cached copy of {url}, using it anyway: {str(e)}")
+                    return file_path
+                if head.ok and head.headers.get('ETag') == cached_etag:
+                    logger.info(f"Using cached copy of {url}")
+                    return file_path
+
+        response = http.get(url, stream=True, timeout=timeout)
         response.raise_for_status()
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-            for chunk in response.iter_content(chunk_size=8192):
-                temp_file.write(chunk)
-            return temp_file.name
+        # Download next to the cache entry and rename it into place, so
+        # workers starting concurrently never read a partial file
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False, suffix=suffix) as temp_file:
+            try:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    temp_file.write(chunk)
+                    digest.update(chunk)
+            except Exception:
+                temp_file.close()
+                os.unlink(temp_file.name)
+                raise
+        os.replace(temp_file.name, file_path)
+
+        with open(sha_path, 'w') as f:
+            f.write(digest.hexdigest())
+
+        etag = response.headers.get('ETag')
+        if etag:
+            with open(etag_path, 'w') as f:
+                f.write(etag)
+        elif os.path.exists(etag_path):
+            os.unlink(etag_path)
+        return file_path
     except Exception as e:
         logger.error(f"Failed to download file from {url}: {str(e)}")
         raise
+    finally:
+        http.close()
 
 
 def load_tflite_model(model_path):
     """
     Loads the TensorFlow Lite model into an interpreter.
+
+    The interpreter runs single-threaded: a batch=1 MLP gains nothing from
+    extra threads, and the XNNPACK delegate bundled with TensorFlow Lite is
+    applied to float models automatically.
     """
     try:
-        interpreter = Interpreter(model_path=model_path)
+        interpreter = Interpreter(model_path=model_path, num_threads=1)
+
+        # Pin the input to a static (1, NUM_FEATURES) shape so the runtime
+        # plans its buffers once for the only shape we ever feed it
+        input_index = interpreter.get_input_details()[0]['index']
+        interpreter.resize_tensor_input(input_index, [1, NUM_FEATURES], strict=True)
         interpreter.allocate_tensors()
+
+        # Run one dummy inference so the first request doesn't pay for
+        # delegate preparation and lazy kernel initialization
+        input_detail = interpreter.get_input_details()[0]
+        warmup_input = np.zeros(input_detail['shape'], dtype=input_detail['dtype'])
+        interpreter.set_tensor(input_index, warmup_input)
+        interpreter.invoke()
+
         logger.info("TensorFlow Lite model loaded successfully.")
         return interpreter
     except Exception as e:
@@ -80,44 +253,211 @@ def load_scaler(scaler_path):
 
 def initialize_model_and_scaler():
     """
-    Initializes the TensorFlow Lite model and scaler by downloading them from the configured URLs.
+    Initializes the TensorFlow Lite interpreter pool and scaler by downloading them from the configured URLs.
     """
-    global interpreter, scaler
+    global scaler, scaler_mean, scaler_scale, input_details, output_details
     try:
-        model_path = download_file(app.config['MODEL_URL'], '.tflite')
-        scaler_path = download_file(app.config['SCALER_URL'], '.pkl')
-
-        interpreter = load_tflite_model(model_path)
+        # The two downloads are independent, so fetch them concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            model_download = executor.submit(download_file, app.config['MODEL_URL'], '.tflite')
+            scaler_download = executor.submit(download_file, app.config['SCALER_URL'], '.pkl')
+            model_path = model_download.result()
+            scaler_path = scaler_download.result()
+
+        interpreters = [load_tflite_model(model_path) for _ in range(app.config['INTERPRETER_POOL_SIZE'])]
         scaler = load_scaler(scaler_path)
 
-        # Clean up temporary files
-        os.unlink(model_path)
-        os.unlink(scaler_path)
+        # Precompute the StandardScaler parameters so requests can be scaled
+        # with plain NumPy instead of a pandas DataFrame + scaler.transform
+        scaler_mean = scaler.mean_ if scaler.with_mean else np.zeros(NUM_FEATURES)
+        scaler_scale = scaler.scale_ if scaler.with_std else np.ones(NUM_FEATURES)
+
+        # Tensor details never change after allocation and are identical
+        # across the pool, so look them up once
+        input_details = interpreters[0].get_input_details()
+        output_details = interpreters[0].get_output_details()
+
+        for interpreter in interpreters:
+            # Accessor returning a zero-copy view of the interpreter's input buffer
+            input_tensor = interpreter.tensor(input_details[0]['index'])
+            interpreter_pool.put((interpreter, input_tensor))
     except Exception as e:
         logger.critical(f"Failed to initialize model or scaler: {str(e)}")
         raise
 
 
-def predict_with_tflite(interpreter, input_data):
+def start_mongo_writer():
     """
-    Runs a prediction using the TensorFlow Lite interpreter.
+    Creates the write queue and starts the MongoDB writer thread for the
+    current process. It is started on first use rather than at import, so a
+    preloaded gunicorn master forks without any extra threads running.
     """
-    try:
-        input_details = interpreter.get_input_details()
-        output_details = interpreter.get_output_details()
+    global mongo_write_queue, mongo_writer_thread, mongo_writer_pid
+    with mongo_writer_lock:
+        if mongo_writer_pid == os.getpid():
+            return
+
+        mongo_write_queue = queue.Queue(maxsize=app.config['MONGO_WRITE_QUEUE_SIZE'])
+        mongo_writer_thread = threading.Thread(target=mongo_writer, name='mongo-writer', daemon=True)
+        mongo_writer_thread.start()
+        mongo_writer_pid = os.getpid()
 
-        # Prepare input tensor
-        interpreter.set_tensor(input_details[0]['index'], input_data)
-        interpreter.invoke()
 
-        # Get the prediction
-        prediction = interpreter.get_tensor(output_details[0]['index'])
+def quantize_input(rows):
+    """
+    Converts scaled float rows to the model's input type, applying the input
+    quantization parameters when the model is integer-quantized.
+    """
+    dtype = input_details[0]['dtype']
+    scale, zero_point = input_details[0]['quantization']
+    if scale == 0:
+        return rows.astype(dtype)
+
+    limits = np.iinfo(dtype)
+    return np.clip(np.round(rows / scale + zero_point), limits.min, limits.max).astype(dtype)
+
+
+def dequantize_output(predictions):
+    """
+    Converts the model's raw output back to float scores when the model is
+    integer-quantized.
+    """
+    scale, zero_point = output_details[0]['quantization']
+    if scale == 0:
+        return predictions
+    return (predictions.astype(np.float32) - zero_point) * scale
+
+
+def predict_with_tflite(input_data):
+    """
+    Runs a prediction using a TensorFlow Lite interpreter from the pool.
+    """
+    try:
+        interpreter, input_tensor = interpreter_pool.get()
+        try:
+            # Write straight into the preallocated input tensor; the view is
+            # a temporary so no reference to it is held across invoke()
+            input_tensor()[:] = quantize_input(input_data)
+            interpreter.invoke()
+
+            # Get the prediction
+            prediction = dequantize_output(interpreter.get_tensor(output_details[0]['index']))
+        finally:
+            interpreter_pool.put((interpreter, input_tensor))
         return prediction[0][0]
     except Exception as e:
         logger.error(f"Prediction with TensorFlow Lite failed: {str(e)}")
         return None
 
 
+@lru_cache(maxsize=app.config['PREDICTION_CACHE_SIZE'])
+def cached_prediction(age, year1_marks, year2_marks, studytime, failures):
+    """
+    Scales the inputs, runs the model and returns the capped prediction score.
+    Results are memoized since the model is deterministic; failures raise
+    PredictionError so they are never cached.
+    """
+    # Prepare input data for prediction (same arithmetic as scaler.transform)
+    input_data = np.array([[age, year1_marks, year2_marks, studytime, failures]], dtype=np.float64)
+    scaled_data = ((input_data - scaler_mean) / scaler_scale).astype(np.float32)
+
+    # Run the prediction
+    prediction = predict_with_tflite(scaled_data)
+    if prediction is None:
+        raise PredictionError("Prediction failed")
+
+    # Cap the prediction score to the max allowed value
+    return min(round(float(prediction), 2), MAX_PREDICTION_SCORE)
+
+
+@lru_cache(maxsize=None)
+def prediction_collection():
+    """
+    Returns the collection prediction records are logged to. It is an audit
+    sink nothing reads back on the request path, so writes are unacknowledged.
+    """
+    return mongo.db.get_collection('student_performance_data', write_concern=WriteConcern(w=0))
+
+
+def mongo_writer():
+    """
+    Writes queued prediction records to MongoDB in batches, collecting up to
+    MONGO_WRITE_BATCH_SIZE records or waiting MONGO_WRITE_INTERVAL seconds.
+    Returns once it reads the None sentinel, after writing what came before it.
+    """
+    max_batch = app.config['MONGO_WRITE_BATCH_SIZE']
+    stopping = False
+
+    while not stopping:
+        record = mongo_write_queue.get()
+        if record is None:
+            return
+
+        batch = [record]
+        deadline = time.monotonic() + app.config['MONGO_WRITE_INTERVAL']
+        while len(batch) < max_batch:
+            try:
+                record = mongo_write_queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if record is None:
+                stopping = True
+                break
+            batch.append(record)
+
+        try:
+            prediction_collection().insert_many(batch, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to save {len(batch)} predictions to MongoDB: {str(e)}")
+
+
+@atexit.register
+def stop_mongo_writer():
+    """
+    Stops the background writer when the process exits and waits for it to
+    write every queued record, including any batch it has already dequeued.
+    """
+    if mongo_writer_pid != os.getpid() or not mongo_writer_thread.is_alive():
+        return
+
+    mongo_write_queue.put(None)
+    mongo_writer_thread.join()
+
+
+def save_to_mongo(data):
+    """
+    Queues a prediction record for the background writer, falling back to a
+    direct insert when the queue is full or background writes are disabled.
+    """
+    if not app.config['MONGO_BACKGROUND_WRITES']:
+        prediction_collection().insert_one(data)
+        return
+
+    if mongo_writer_pid != os.getpid():
+        start_mongo_writer()
+
+    try:
+        mongo_write_queue.put_nowait(data)
+    except queue.Full:
+        prediction_collection().insert_one(data)
+
+
+def validate_input(age, year1_marks, year2_marks, studytime, failures):
+    """
+    Raises ValueError if any input is outside its allowed range.
+    """
+    if not (0 <= age <= MAX_AGE):
+        raise ValueError(f"Age must be between 0 and {MAX_AGE}")
+    if not (0 <= year1_marks <= 100):
+        raise ValueError("Year 1 marks must be between 0 and 100")
+    if not (0 <= year2_marks <= 100):
+        raise ValueError("Year 2 marks must be between 0 and 100")
+    if not (0 <= studytime <= MAX_STUDY_HOURS):
+        raise ValueError(f"Study time must be between 0 and {MAX_STUDY_HOURS}")
+    if not (0 <= failures <= MAX_FAILURES):
+        raise ValueError(f"Failures must be between 0 and {MAX_FAILURES}")
+
+
 @app.route('/')
 def index():
     """
@@ -132,44 +472,19 @@ def predict():
     Handles predictions from form submissions.
     """
     try:
-        # Retrieve and validate form data
-        name = request.form['name']
-        age = int(request.form['age'])
-        year1_marks = float(request.form['year1_marks'])
-        year2_marks = float(request.form['year2_marks'])
-        studytime = float(request.form['study_time'])
-        failures = int(request.form['failures'])
-
-        if not (0 <= age <= app.config['MAX_AGE']):
-            raise ValueError(f"Age must be between 0 and {app.config['MAX_AGE']}")
-        if not (0 <= year1_marks <= 100):
-            raise ValueError("Year 1 marks must be between 0 and 100")
-        if not (0 <= year2_marks <= 100):
-            raise ValueError("Year 2 marks must be between 0 and 100")
-        if not (0 <= studytime <= app.config['MAX_STUDY_HOURS']):
-            raise ValueError(f"Study time must be between 0 and {app.config['MAX_STUDY_HOURS']}")
-        if not (0 <= failures <= app.config['MAX_FAILURES']):
-            raise ValueError(f"Failures must be between 0 and {app.config['MAX_FAILURES']}")
-
-        # Prepare input data for prediction
-        input_data = pd.DataFrame({
-            'age': [age],
-            'year1_marks': [year1_marks],
-            'year2_marks': [year2_marks],
-            'studytime': [studytime],
-            'failures': [failures]
-        })
-
-        scaled_data = scaler.transform(input_data)
-        scaled_data = scaled_data.astype(np.float32)
-
-        # Run the prediction
-        prediction = predict_with_tflite(interpreter, scaled_data)
-        if prediction is None:
-            return jsonify({'error': 'Prediction failed'}), 500
-
-        # Cap the prediction score to the max allowed value
-        capped_prediction = min(round(float(prediction), 2), app.config['MAX_PREDICTION_SCORE'])
+        # Retrieve and validate form data; resolve the request proxy once
+        form = request.form
+        name = form['name']
+        age = int(form['age'])
+        year1_marks = float(form['year1_marks'])
+        year2_marks = float(form['year2_marks'])
+        studytime = float(form['study_time'])
+        failures = int(form['failures'])
+
+        validate_input(age, year1_marks, year2_marks, studytime, failures)
+
+        # Run the (cached) prediction
+        capped_prediction = cached_prediction(age, year1_marks, year2_marks, studytime, failures)
 
         # Prepare data for MongoDB
         data = {
@@ -180,18 +495,19 @@ def predict():
             'study_time': studytime,
             'failures': failures,
             'predicted_score': capped_prediction,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'timestamp': datetime.now().isoformat(sep=' ', timespec='seconds')
         }
 
-        # Save prediction data to MongoDB
-        collection = mongo.db.student_performance_data
-        collection.insert_one(data)
+        # Save prediction data to MongoDB off the request path
+        save_to_mongo(data)
 
         return jsonify({'prediction': capped_prediction})
     except KeyError:
         return jsonify({'error': 'Missing required field'}), 400
     except ValueError as ve:
         return jsonify({'error': str(ve)}), 400
+    except PredictionError:
+        return jsonify({'error': 'Prediction failed'}), 500
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -9,12 +9,23 @@ class Config:
     MONGO_URI = os.getenv('MONGO_URI')
     SESSION_COOKIE_SECURE = True
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=30)
-    MODEL_URL = os.getenv('MODEL_URL')  # URL for the hosted .tflite model
+    MODEL_URL = os.getenv('MODEL_URL')  # URL for the hosted .tflite model (float32 or full-integer int8)
     SCALER_URL = os.getenv('SCALER_URL')  # URL for the hosted scaler .pkl file
+    # Download cache shared by this user's workers; must be private since the scaler in it is unpickled
+    MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'modelcache'))
+    DOWNLOAD_TIMEOUT = 30  # Seconds to wait on the model host before giving up
     MAX_PREDICTION_SCORE = 98
     MAX_AGE = 100
     MAX_STUDY_HOURS = 24
     MAX_FAILURES = 10
+    PREDICTION_CACHE_SIZE = 4096  # Number of distinct inputs to memoize predictions for
+    INTERPRETER_POOL_SIZE = int(os.getenv('INTERPRETER_POOL_SIZE', 1))  # Keep in line with gunicorn --threads
+    # The background writer needs a long-lived process; serverless functions (Vercel)
+    # are frozen after each response and never run atexit, so write synchronously there
+    MONGO_BACKGROUND_WRITES = not os.getenv('VERCEL')
+    MONGO_WRITE_QUEUE_SIZE = 10000  # Pending prediction records before falling back to direct inserts
+    MONGO_WRITE_BATCH_SIZE = 500  # Max records per insert_many call
+    MONGO_WRITE_INTERVAL = 0.05  # Seconds to wait for more records before writing a batch
     # Optional: Add other environment-specific configurations as needed.
 
 class ProductionConfig(Config):
@@ -0,0 +1,27 @@
+import os
+
+
+def pre_fork(server, worker):
+    """
+    Picks a CPU for the worker about to be forked. This runs in the master,
+    where server.WORKERS holds the live workers and the CPU each was given,
+    so a respawned worker takes over the CPU its predecessor freed.
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return
+
+    used = [getattr(w, 'cpu', None) for w in server.WORKERS.values()]
+    worker.cpu = min(sorted(os.sched_getaffinity(0)), key=used.count)
+
+
+def post_fork(server, worker):
+    """
+    Pins each worker to its own CPU so the workers' single-threaded
+    interpreters don't contend for (and bounce between) the same cores.
+    Workers run one request thread and one interpreter, matching the pin.
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return
+
+    os.sched_setaffinity(0, {worker.cpu})
+    server.log.info(f"Pinned worker {worker.pid} to CPU {worker.cpu}")